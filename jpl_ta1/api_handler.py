@@ -27,12 +27,15 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
-import requests
+import gzip
+import io
+import orjson
 import pandas as pd
 import time
-from typing import List, Any
-from requests.exceptions import ConnectionError, Timeout
-from jpl_ta1.utils.decorators import retry
+from typing import List, Any, Optional, Tuple
+from requests.adapters import HTTPAdapter
+from requests_cache import CachedSession, DO_NOT_CACHE
+from urllib3.util.retry import Retry
 from jpl_ta1.logger import get_module_logger
 
 class LwllApiHandler:
@@ -40,73 +43,101 @@ class LwllApiHandler:
     API Handler helper class to abstract away HTTP requests
     """
 
-    def __init__(self, base_url: str, team_secret: str, **kwargs: Any) -> None:
+    def __init__(self, base_url: str, team_secret: str, pool_maxsize: int = 16, use_arrow: bool = False,
+                 compress_predictions: bool = False, **kwargs: Any) -> None:
         self.base_url = base_url
         self.team_secret = team_secret
+        self.use_arrow = use_arrow  # submit predictions as Arrow/Feather bytes instead of JSON
+        self.compress_predictions = compress_predictions  # gzip the JSON predictions body
+        self.pool_maxsize = pool_maxsize  # connections per host kept open for reuse
         self.non_session_headers = {'user_secret': self.team_secret}
         self.session_token = None
         # self.log = kwargs['log']
         self.log = get_module_logger(__name__, kwargs['log'])
 
-    @retry((ConnectionError, Timeout))
+        # Persistent HTTP session so that connections are kept alive and reused across api calls. Responses from the
+        # read-only task endpoints are cached locally, anything tied to a live session is never cached. The cache outlives
+        # a run, so responses are keyed on the team secret they were fetched with
+        urls_expire_after = {
+            '*/list_tasks': 3600,
+            '*/task_metadata/*': 86400,
+            '*/session_status': DO_NOT_CACHE,
+            '*/seed_labels': DO_NOT_CACHE,
+            '*/submit_predictions': DO_NOT_CACHE,
+        }
+        self._session = CachedSession(cache_name='.lwll_cache', backend='sqlite', expire_after=3600, allowable_methods=('GET',),
+                                      match_headers=['user_secret'], urls_expire_after=urls_expire_after)
+        self._session.headers.update(self.non_session_headers)
+        # Transient failures (connection errors, 429 and 5xx responses) are retried at the transport level with a
+        # capped, jittered exponential backoff
+        retries = Retry(total=3, backoff_factor=1.0, backoff_jitter=0.5, backoff_max=30,
+                        status_forcelist=(429, 500, 502, 503, 504), allowed_methods=frozenset(['GET', 'POST']),
+                        raise_on_status=False)
+        # `pool_maxsize` bounds how many connections per host are kept around for concurrent api calls
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize, pool_block=False, max_retries=retries)
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+
+    def close(self) -> None:
+        """
+        Helper method to release the pooled connections held by the underlying HTTP session
+        """
+        self._session.close()
+
     def get_all_tasks(self) -> dict:
         """
         Helper method to get all available tasks
         """
-        self.log.debug(f"API handler calling `/list_tasks`")
-        r = requests.get(f"{self.base_url}/list_tasks", headers=self.non_session_headers)
-        response = r.json()
+        self.log.debug("API handler calling `/list_tasks`")
+        r = self._session.get(f"{self.base_url}/list_tasks")
+        response = orjson.loads(r.content)
         if response:
-            self.log.debug(f"api list_tasks response is {response}")
+            self.log.debug("api list_tasks response is %s", response)
             tasks: dict = response['tasks']
             return tasks
         else:
             raise Exception("received an empty response from api")
 
-    @retry((ConnectionError, Timeout))
     def get_task_metadata(self, task_id: str) -> dict:
         """
         Helper method to get a particular task metadata
         """
-        self.log.debug(f"API handler calling `/task_metadata/{task_id}`")
-        r = requests.get(f"{self.base_url}/task_metadata/{task_id}", headers=self.non_session_headers)
-        response: dict = r.json()
-        self.log.debug(f"{response}")
+        self.log.debug("API handler calling `/task_metadata/%s`", task_id)
+        r = self._session.get(f"{self.base_url}/task_metadata/{task_id}")
+        response: dict = orjson.loads(r.content)
+        self.log.debug("%s", response)
         return response
 
-    @retry((ConnectionError, Timeout))
     def start_session(self, task_id: str, session_name: str, data_type: str) -> str:
         """
         Helper method to start a session with parameters and get the session token back
         """
-        self.log.debug(f"API handler calling `/create_session`")
-        r = requests.post(f"{self.base_url}/auth/create_session", json={'session_name': session_name,
-                                                                        'data_type': data_type, 'task_id': task_id}, headers=self.non_session_headers)
-        response = r.json()
-        self.log.debug(f"{response}")
+        self.log.debug("API handler calling `/create_session`")
+        r = self._session.post(f"{self.base_url}/auth/create_session", json={'session_name': session_name,
+                                                                             'data_type': data_type, 'task_id': task_id})
+        response = orjson.loads(r.content)
+        self.log.debug("%s", response)
         session_token: str = response['session_token']
         return session_token
 
-    @retry((ConnectionError, Timeout))
     def get_session_metadata(self, session_token: str) -> dict:
         """
         Helper method to get session metadata
         """
-        self.log.debug(f"API handler calling `/session_status`")
-        r = requests.get(f"{self.base_url}/session_status", headers=self._get_session_headers(session_token))
-        response = r.json()
-        self.log.debug(f"{response}")
+        self.log.debug("API handler calling `/session_status`")
+        r = self._session.get(f"{self.base_url}/session_status", headers={'session_token': session_token})
+        response = orjson.loads(r.content)
+        self.log.debug("%s", response)
         metadata: dict = response['Session_Status']
         return metadata
 
-    # @retry((ConnectionError, Timeout))
     def get_seed_labels(self, session_token: str) -> List[dict]:
         """
         Helper method to get the first round of seed labels
         """
-        self.log.debug(f"API handler calling `/seed_labels`")
-        r = requests.get(f"{self.base_url}/seed_labels", headers=self._get_session_headers(session_token))
-        response = r.json()
+        self.log.debug("API handler calling `/seed_labels`")
+        r = self._session.get(f"{self.base_url}/seed_labels", headers={'session_token': session_token})
+        response = orjson.loads(r.content)
         if r.status_code == 200:
             if 'Labels' in response.keys():
                 labels: list = response['Labels']
@@ -117,34 +148,47 @@ class LwllApiHandler:
         else:
             self.log.exception(response.get('trace', response.get('Error', 'unknown error')))
 
-    @retry((ConnectionError, Timeout))
-    def submit_predictions(self, session_token: str, predictions: pd.DataFrame) -> None:
+    def submit_predictions(self, session_token: str, predictions: pd.DataFrame) -> Optional[dict]:
         """
         Helper method to submit predictions
+
+        Returns the updated session metadata when the api includes it in the response, otherwise None
         """
-        self.log.debug(f"API handler calling `/submit_predictions`")
-        r = requests.post(f"{self.base_url}/submit_predictions", json={'predictions': predictions.to_dict()}, headers=self._get_session_headers(session_token))
-        response = r.json()
+        self.log.debug("API handler calling `/submit_predictions`")
+        headers = {'session_token': session_token}
+        if self.use_arrow:
+            buf = io.BytesIO()
+            predictions.reset_index(drop=True).to_feather(buf)
+            body = buf.getvalue()
+            headers['Content-Type'] = 'application/vnd.apache.arrow.file'
+        else:
+            # The api expects the default `to_dict()` layout, whose integer index keys and numpy scalars need the extra orjson options
+            body = orjson.dumps({'predictions': predictions.to_dict()}, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+            headers['Content-Type'] = 'application/json'
+            if self.compress_predictions:
+                # Prediction payloads are highly redundant so the fastest compression level is plenty
+                body = gzip.compress(body, compresslevel=1)
+                headers['Content-Encoding'] = 'gzip'
+        r = self._session.post(f"{self.base_url}/submit_predictions", data=body, headers=headers)
+        response = orjson.loads(r.content)
         if r.status_code != 200:
             self.log.error(response.get('trace', response.get('Error', 'unknown error')))
+            return None
 
-        self.log.debug(f"{response}")
-        return
+        self.log.debug("%s", response)
+        metadata: Optional[dict] = response.get('Session_Status')
+        return metadata
 
-    @retry((ConnectionError, Timeout))
-    def request_labels(self, session_token: str, items: List[str]) -> list:
+    def request_labels(self, session_token: str, items: List[str]) -> Tuple[list, Optional[dict]]:
         """
         Helper method to request labels
+
+        Returns the labels along with the updated session metadata when the api includes it in the response, otherwise None
         """
-        self.log.debug(f"API handler calling `/query_labels`")
-        r = requests.post(f"{self.base_url}/query_labels", json={'example_ids': items}, headers=self._get_session_headers(session_token))
-        response = r.json()
-        self.log.debug(f"{response}")
+        self.log.debug("API handler calling `/query_labels`")
+        r = self._session.post(f"{self.base_url}/query_labels", json={'example_ids': items}, headers={'session_token': session_token})
+        response = orjson.loads(r.content)
+        self.log.debug("%s", response)
         labels: list = response['Labels']
-        return labels
-
-    @retry((ConnectionError, Timeout))
-    def _get_session_headers(self, session_token: str) -> dict:
-        _headers = self.non_session_headers
-        _headers['session_token'] = session_token
-        return _headers
+        metadata: Optional[dict] = response.get('Session_Status')
+        return labels, metadata
@@ -30,22 +30,30 @@
 import logging
 from typing import Any
 
-def get_module_logger(module_name, level: str) -> logging.Logger:
-    logging.basicConfig(format='%(asctime)s,%(msecs)d %(levelname)-8s [%(filename)s:%(lineno)d] %(message)s',
-                        datefmt="%m-%d:%H:%M:%S")
+VALID_LOG_LEVELS = frozenset({"DEBUG", "INFO", "WARNING", "ERROR"})
+
+_configured = False
+
+def _configure_once() -> None:
+    """
+    Configure the root handler the first time a module logger is requested
+    """
+    global _configured
+    if not _configured:
+        logging.basicConfig(format='%(asctime)s,%(msecs)d %(levelname)-8s [%(filename)s:%(lineno)d] %(message)s',
+                            datefmt="%m-%d:%H:%M:%S")
+        _configured = True
+
+def get_module_logger(module_name: str, level: str) -> logging.Logger:
+    _configure_once()
     logger = logging.getLogger(module_name)
 
-    if level not in ["DEBUG", "INFO", "WARNING", "ERROR"]:
+    if level not in VALID_LOG_LEVELS:
         raise Exception(f"Invalid logging level: {level}")
 
-    if level == "DEBUG":
-        logger.setLevel(logging.DEBUG)
-    elif level == "INFO":
-        logger.setLevel(logging.INFO)
-    elif level == "WARNING":
-        logger.setLevel(logging.WARNING)
-    elif level == "ERROR":
-        logger.setLevel(logging.ERROR)
+    numeric_level = getattr(logging, level)
+    if logger.level != numeric_level:
+        logger.setLevel(numeric_level)
 
     return logger
 
@@ -27,10 +27,11 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
+import os
+import numpy as np
 import pandas as pd
-from typing import List, Tuple, Any
+from typing import List, Tuple, Any, Optional
 from pathlib import Path
-import random
 from jpl_ta1.logger import get_module_logger
 
 class ModelWrapper:
@@ -73,6 +74,7 @@ class ModelWrapper:
         self.dataset_config = dataset_config  # how we know if we are doing 'sample' or 'full'
         self.dataset_metadata: dict = {}  # gives us information about what type of dataset we are dealing with
         self.pair_stage = ''  # Either `base` or `adaptation` -- Set after instantiation
+        self._pred_ids = np.empty(0, dtype=object)  # ids of the test set we predict on -- Set with the stage
         self.log = get_module_logger(__name__, kwargs['log'])
 
     def set_stage(self, stage: str, dataset_metadata: dict) -> None:
@@ -82,6 +84,8 @@ class ModelWrapper:
         """
         self.pair_stage = stage
         self.dataset_metadata = dataset_metadata
+        # The test ids don't change within a stage so we look them up once here rather than on every `predict`
+        self._pred_ids = self._get_prediction_ids()
         return
 
     def fit(self, data: dict) -> None:
@@ -92,13 +96,8 @@ class ModelWrapper:
         pass
 
     def predict(self) -> pd.DataFrame:
-        if self.dataset_metadata['dataset_type'] == 'machine_translation':
-            test_df = self._get_test_data_mt()
-            df = self._generate_random_predictions_on_test_set(model_type=self.dataset_metadata['dataset_type'], test_df=test_df)
-        else:
-            test_imgs, dataset_classes = self._get_test_images_and_classes()
-            df = self._generate_random_predictions_on_test_set(model_type=self.dataset_metadata['dataset_type'],
-                                                               test_imgs=test_imgs, current_dataset_classes=dataset_classes)
+        df = self._generate_random_predictions_on_test_set(model_type=self.dataset_metadata['dataset_type'], test_ids=self._pred_ids,
+                                                           current_dataset_classes=self.dataset_metadata.get('classes'))
         return df
 
     def most_uncertain_unlabeled_items(self) -> List[str]:
@@ -110,6 +109,13 @@ class ModelWrapper:
         """
         return []
 
+    def _get_dataset_split_dir(self) -> Path:
+        """
+        Helper method to get the directory of the `sample` or `full` split of the current dataset
+        """
+        current_dataset_name = self.dataset_metadata['name']
+        return self.dataset_dir / self.working_path / current_dataset_name / f"{current_dataset_name}_{self.dataset_config}"
+
     def _get_test_images_and_classes(self) -> Tuple[List[str], List[str]]:
         """
         Helper method to dynamically get the test labels and give us the possible classes that can be submitted
@@ -121,17 +127,18 @@ class ModelWrapper:
         Tuple[List[str], List[str]]
             The list of test image ids needed to submit a prediction and the list of class names that you can predict against
         """
-        current_dataset_name = self.dataset_metadata['name']
         current_dataset_classes = self.dataset_metadata['classes']
 
-        test_imgs_dir = self.dataset_dir.joinpath(f"{self.working_path}/{current_dataset_name}/{current_dataset_name}_{self.dataset_config}/test")
+        test_imgs_dir = self._get_dataset_split_dir() / 'test'
         if (self.dataset_metadata['dataset_type'] == 'video_classification'):
             test_imgs = [test_imgs_dir]
         else:
-            test_imgs = [f.name for f in test_imgs_dir.iterdir() if f.is_file()]
+            # `DirEntry.is_file()` reuses the type info from the directory listing instead of stat-ing every file
+            with os.scandir(test_imgs_dir) as it:
+                test_imgs = [entry.name for entry in it if entry.is_file()]
         return test_imgs, current_dataset_classes
 
-    def _get_test_data_mt(self) -> List[str]:
+    def _get_test_data_mt(self) -> pd.DataFrame:
         """
         Helper method to dynamically get the test labels and give us the possible classes that can be submitted
         for the current dataset
@@ -151,49 +158,48 @@ class ModelWrapper:
         pd.DataFrame
             The DataFrame on which you must make predictions from a 'source' column
         """
-        # Then we can just reference our current metadata to get our dataset name and use that in the path
-        current_dataset_name = self.dataset_metadata['name']
-
-        _path = str(
-            self.dataset_dir.joinpath(f"{self.working_path}/{current_dataset_name}/{current_dataset_name}_{self.dataset_config}/test_data.feather"))
+        _path = str(self._get_dataset_split_dir() / 'test_data.feather')
         test_df = pd.read_feather(_path)
         return test_df
 
+    def _get_prediction_ids(self) -> np.ndarray:
+        """
+        Helper method to get the ids of the test set that we have to submit predictions for on the current dataset
+        """
+        if self.dataset_metadata['dataset_type'] == 'machine_translation':
+            return self._get_test_data_mt()['id'].to_numpy(dtype=object)
+
+        test_imgs, _ = self._get_test_images_and_classes()
+        if self.dataset_metadata['dataset_type'] == 'video_classification':
+            # Each video is a directory of frames under `test` and we predict one class per video
+            with os.scandir(test_imgs[0]) as it:
+                test_imgs = [vid.name for vid in it]
+            # if '.DS_Store' in test_imgs:
+            #    test_imgs.remove('.DS_Store')
+        return np.asarray(test_imgs, dtype=object)
+
     @staticmethod
-    def _generate_random_predictions_on_test_set(model_type: str, test_imgs: List[str] = None, current_dataset_classes: List[str] = None, test_df = None) -> pd.DataFrame:
+    def _generate_random_predictions_on_test_set(model_type: str, test_ids: np.ndarray, current_dataset_classes: Optional[List[str]] = None) -> pd.DataFrame:
         """
         Generates a prediction dataframe for image classification based on random sampling from our available classes
         """
-        if model_type == 'image_classification':
-            rand_lbls = [str(random.choice(current_dataset_classes)) for _ in range(len(test_imgs))]
-            df = pd.DataFrame({'id': test_imgs, 'class': rand_lbls})
+        rng = np.random.default_rng()
+        if model_type in ['image_classification', 'video_classification']:
+            classes_arr = np.asarray([str(c) for c in current_dataset_classes], dtype=object)
+            rand_lbls = rng.choice(classes_arr, size=test_ids.size)
+            df = pd.DataFrame({'id': test_ids, 'class': rand_lbls}, copy=False)
         elif model_type == 'object_detection':
             # We just use random labels for example. Our labels have to have a bounding box, confidence and class for object detection
             # bounding boxes are defined as '<xmin>, <ymin>, <xmax>, <ymax>''
             # This would be your inferences filling this DataFrame though.
-            rand_lbls = ['20, 20, 80, 80' for _ in range(len(test_imgs))]
-            conf = [0.95 for _ in range(len(test_imgs))]
-            classes = [current_dataset_classes[0] for _ in range(len(test_imgs))]
-            df = pd.DataFrame({'id': test_imgs, 'bbox': rand_lbls, 'confidence': conf, 'class': classes})
+            rand_lbls = np.full(test_ids.size, '20, 20, 80, 80', dtype=object)
+            conf = np.full(test_ids.size, 0.95)
+            classes = np.full(test_ids.size, current_dataset_classes[0], dtype=object)
+            df = pd.DataFrame({'id': test_ids, 'bbox': rand_lbls, 'confidence': conf, 'class': classes}, copy=False)
         elif model_type == 'machine_translation':
             # We make fake predictions and want a DataFrame with the columns
             # 'id' and 'text'
             pred = 'The quick brown fox jumps over the lazy dog'
-            pred_list = [pred for _ in range(len(test_df))]
-            df = pd.DataFrame({'id': test_df['id'].tolist(), 'text': pred_list})
-        elif model_type == 'video_classification':
-            test_vid_dir = test_imgs[0]
-            test_ids =  [vid.name for vid in test_vid_dir.iterdir()]
-            # if '.DS_Store' in test_ids:
-            #    test_ids.remove('.DS_Store')
-
-            data = []
-            for tid in test_ids:
-                fr_list = [f.name for f in test_vid_dir.joinpath(tid).iterdir() if f.is_file()]
-                # if '.DS_Store' in fr_list:
-                #     fr_list.remove('.DS_Store')
-                fr_list = sorted(fr_list)
-                data.append({'id': tid,
-                             'class': str(random.choice(current_dataset_classes))})
-            df = pd.DataFrame(columns=['id', 'class']).from_dict(data)
+            pred_list = np.full(test_ids.size, pred, dtype=object)
+            df = pd.DataFrame({'id': test_ids, 'text': pred_list}, copy=False)
         return df
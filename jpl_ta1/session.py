@@ -27,11 +27,13 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
-import json
+import orjson
 import time
+from hashlib import blake2b
+from concurrent.futures import ThreadPoolExecutor
 from jpl_ta1.api_handler import LwllApiHandler
 from jpl_ta1.model_wrapper import ModelWrapper
-from typing import List, Any
+from typing import List, Any, Optional
 from datetime import datetime
 from jpl_ta1.logger import get_module_logger
 
@@ -53,6 +55,7 @@ class Session:
         # Session state variables
         session_name = f"{name_prefix} - Run starting at {datetime.now().strftime('%m/%d/%Y, %H:%M:%S')} - {name_postfix}"
         self.log.info(f"Starting session with name: {session_name}")
+        self._last_meta_hash: Optional[bytes] = None  # digest of the last fetched metadata to detect changes on refresh
         self.session_token = self.api_handler.start_session(self.task_id, session_name, self.dataset_config)
         self.metadata = self._refresh_metadata()
         self.log.debug(f'Initial Session Metadata: {self.metadata}')
@@ -77,20 +80,25 @@ class Session:
             model.set_stage(stage, self.metadata['current_dataset'])
 
             # Stage 1 - 4 Get Seed Labels
+            # Each seed round depends on the previous round's submission, so the rounds themselves stay sequential. Within
+            # a round we overlap the metadata refresh request with fitting and predicting.
             if self.problem_type != 'machine_translation':
-                for i in range(4):
-                    self.log.info(f"Getting Round {i + 1} Seed Labels")
-                    seed_labels = self.api_handler.get_seed_labels(self.session_token)
-                    self.metadata = self._refresh_metadata()  # refreshes how many labels we have until checkpoint
-                    self.log.info(f"Budget used: {self.metadata['budget_used']}, " +
-                                  f"Budget left: {self.metadata['budget_left_until_checkpoint']}")
-                    self._add_to_label_cache(seed_labels, seed_round=True)
-                    model.fit(self.label_cache)
-                    self.api_handler.submit_predictions(self.session_token, model.predict())
-                    self.metadata = self._refresh_metadata()
-                    # self.log.info(f"Submitted predictions: {self.metadata}")
-                    self.log.info(f"Submitted predictions. Budget used: {self.metadata['budget_used']}, "
-                                  + f"Budget left: {self.metadata['budget_left_until_checkpoint']}")
+                with ThreadPoolExecutor(max_workers=1) as executor:
+                    for i in range(4):
+                        self.log.info(f"Getting Round {i + 1} Seed Labels")
+                        seed_labels = self.api_handler.get_seed_labels(self.session_token)
+                        metadata_future = executor.submit(self._refresh_metadata)  # refreshes how many labels we have until checkpoint
+                        self._add_to_label_cache(seed_labels, seed_round=True)
+                        model.fit(self.label_cache)
+                        predictions = model.predict()
+                        self.metadata = metadata_future.result()
+                        self.log.info(f"Budget used: {self.metadata['budget_used']}, " +
+                                      f"Budget left: {self.metadata['budget_left_until_checkpoint']}")
+                        status = self.api_handler.submit_predictions(self.session_token, predictions)
+                        self.metadata = self._refresh_metadata(status)
+                        # self.log.info(f"Submitted predictions: {self.metadata}")
+                        self.log.info(f"Submitted predictions. Budget used: {self.metadata['budget_used']}, "
+                                      + f"Budget left: {self.metadata['budget_left_until_checkpoint']}")
 
             # Stage 5 - 8 -- Active Learning Rounds
             for i in range(range_lim):
@@ -100,16 +108,16 @@ class Session:
                     self.log.info(f"Starting checkpoint `{i+5}` loop for current stage")
 
                 while self.metadata['budget_left_until_checkpoint'] > 0:
-                    self._request_label_loop(model)
+                    status = self._request_label_loop(model)
                     model.fit(self.label_cache)
-                    self.metadata = self._refresh_metadata()  # refreshes how many labels we have until checkpoint
+                    self.metadata = self._refresh_metadata(status)  # refreshes how many labels we have until checkpoint
                     self.log.info(f"Submitted predictions. Budget used: {self.metadata['budget_used']}, "
                                   + f"Budget left: {self.metadata['budget_left_until_checkpoint']}")
                     # While this JPL TA1 is just a shell, we artificially change the metadata `budget_left_until_checkpoint` to 0
                     # When we start actually requesting labels this will go down as we request more labels in our `_request_label_loop` loop
                     self.metadata['budget_left_until_checkpoint'] = 0
-                self.api_handler.submit_predictions(self.session_token, model.predict())
-                self.metadata = self._refresh_metadata()
+                status = self.api_handler.submit_predictions(self.session_token, model.predict())
+                self.metadata = self._refresh_metadata(status)
 
                 # assert to verify the session metadata is doing what we want it to and we are going on to
                 # the adaptation phase
@@ -126,15 +134,18 @@ class Session:
 
         return
 
-    def _request_label_loop(self, model: ModelWrapper) -> None:
+    def _request_label_loop(self, model: ModelWrapper) -> Optional[dict]:
         """
         Active Learning Loop
 
         In this loop we want to exploit what our model is most uncertain about or other methods to determine what we should be requesting for
+
+        Returns the session metadata if the api sent it back along with the labels
         """
         samples_to_request = model.most_uncertain_unlabeled_items()
-        labels = self.api_handler.request_labels(self.session_token, samples_to_request)
+        labels, status = self.api_handler.request_labels(self.session_token, samples_to_request)
         self._add_to_label_cache(labels, seed_round=False)
+        return status
 
     def _add_to_label_cache(self, labels: List[dict], seed_round: bool = False) -> None:
         """
@@ -145,23 +156,22 @@ class Session:
         """
         pass
 
-    def _refresh_metadata(self) -> dict:
+    def _refresh_metadata(self, metadata: Optional[dict] = None) -> dict:
         """
         Helper to refresh metadata on current session
+
+        If the api already handed back the session metadata (ex. in the response of a submission) we pass it in here
+        and skip fetching it again, unless it came back empty or without the budget we rely on
         """
-        old_metadata = {}
-        # Make sure we've already fetched the metadata before trying to load the old version
-        if hasattr(self, "metadata"):
-            old_metadata = json.loads(json.dumps(self.metadata))
-            # Delete date_last_interacted for comparison as this can give a false positive that things were changed
-            del old_metadata["date_last_interacted"]
-
-        metadata = self.api_handler.get_session_metadata(self.session_token)
-
-        # Check if metadata changed and log if it didn't (json conversion hack to do a deep copy)
-        new_metadata = json.loads(json.dumps(metadata))
-        del new_metadata["date_last_interacted"]
-        if json.dumps(old_metadata) == json.dumps(new_metadata):
+        if not metadata or 'budget_left_until_checkpoint' not in metadata:
+            metadata = self.api_handler.get_session_metadata(self.session_token)
+
+        # Check if metadata changed and log if it didn't. We only keep a digest of the last metadata we saw and leave out
+        # date_last_interacted as this can give a false positive that things were changed
+        meta_hash = blake2b(orjson.dumps({k: v for k, v in metadata.items() if k != "date_last_interacted"},
+                                         option=orjson.OPT_SORT_KEYS)).digest()
+        if meta_hash == self._last_meta_hash:
             self.log.info(f"Session metadata did not change after refresh...")
+        self._last_meta_hash = meta_hash
 
         return metadata
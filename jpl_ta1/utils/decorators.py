@@ -27,16 +27,40 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
-from functools import wraps
+import asyncio
+from functools import partial, wraps
+import inspect
+import random
 import time
 from typing import Any, Callable
 from jpl_ta1.logger import logger
 
-def retry(ExceptionToCheck, tries: int=4, delay: int=3, backoff: int=2) -> Any:
+def _jittered_delay(delay: float, max_delay: float, jitter: float) -> float:
+    """
+    Caps the backoff delay at `max_delay` and then randomly shrinks it by up to `jitter`, so the result never exceeds
+    `max_delay` but stays randomized even once the backoff has hit the cap
+    """
+    return min(delay, max_delay) * random.uniform(1 - jitter, 1)
+
+def _is_coroutine_function(f: Callable) -> bool:
+    """
+    Checks if calling `f` gives back a coroutine we have to await. Unlike a bare `inspect.iscoroutinefunction` this also
+    looks through `functools.partial` wrappers and callable objects with an `async def __call__`
+    """
+    while isinstance(f, partial):
+        f = f.func
+    if not inspect.isroutine(f) and not inspect.isclass(f):
+        return inspect.iscoroutinefunction(getattr(f, '__call__', None))
+    return inspect.iscoroutinefunction(f)
+
+def retry(ExceptionToCheck, tries: int=4, delay: int=3, backoff: int=2, max_delay: float=30.0, jitter: float=0.5) -> Any:
     """
     Retry calling the decorated function using an exponential backoff.
     credit: https://www.saltycrane.com/blog/2009/11/trying-out-retry-decorator-python/
 
+    Coroutine functions are supported as well, in which case we back off with `asyncio.sleep` so the event loop
+    keeps running other tasks in the meantime.
+
     Params
     ------
 
@@ -51,23 +75,55 @@ def retry(ExceptionToCheck, tries: int=4, delay: int=3, backoff: int=2) -> Any:
 
     backoff : int
         backoff multiplier e.g. value of 2 will double the delay each retry
+
+    max_delay : float
+        upper bound in seconds on the delay between retries
+
+    jitter : float
+        fraction by which each delay is randomly shrunk e.g. 0.5 gives a delay anywhere between half and all of the current
+        backoff (itself capped at `max_delay`), so concurrent callers don't all retry in lockstep
     """
+    attempts = max(tries, 1)  # we always call the function at least once
+
     def deco_retry(f: Callable) -> Any:
 
+        # The async wrapper has to await every attempt, otherwise it would hand back the coroutine object unawaited and
+        # exceptions raised by it could never trigger a retry
+        if _is_coroutine_function(f):
+            @wraps(f)
+            async def f_retry_async(*args: Any, **kwargs: Any) -> Any:
+                mdelay = delay
+                for attempt in range(attempts):
+                    try:
+                        return await f(*args, **kwargs)
+                    except ExceptionToCheck as e:
+                        # Out of tries, so there is no point in backing off before giving up
+                        if attempt == attempts - 1:
+                            raise
+                        sleep_for = _jittered_delay(mdelay, max_delay, jitter)
+                        msg = f"{str(e)}, Retrying in {sleep_for:.2f} seconds..."
+                        logger.warning(msg)
+                        await asyncio.sleep(sleep_for)
+                        mdelay *= backoff
+
+            return f_retry_async
+
         @wraps(f)
         def f_retry(*args: Any, **kwargs: Any) -> Any:
-            mtries, mdelay = tries, delay
-            while mtries > 1:
+            mdelay = delay
+            for attempt in range(attempts):
                 try:
                     return f(*args, **kwargs)
                 except ExceptionToCheck as e:
-                    msg = f"{str(e)}, Retrying in {mdelay} seconds..."
+                    # Out of tries, so there is no point in backing off before giving up
+                    if attempt == attempts - 1:
+                        raise
+                    sleep_for = _jittered_delay(mdelay, max_delay, jitter)
+                    msg = f"{str(e)}, Retrying in {sleep_for:.2f} seconds..."
                     logger.warning(msg)
-                    time.sleep(mdelay)
-                    mtries -= 1
+                    time.sleep(sleep_for)
                     mdelay *= backoff
-            return f(*args, **kwargs)
 
         return f_retry  # true decorator
 
-    return deco_retry
\ No newline at end of file
+    return deco_retry
@@ -27,29 +27,40 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
-from typing import List, Any
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Any
 from jpl_ta1.api_handler import LwllApiHandler
 from jpl_ta1.session import Session
+import logging
+import threading
 import time
 from jpl_ta1.logger import get_module_logger
 
+# Api endpoint for each environment we can run against
+_URL_LOOKUP = {
+    'local': 'http://localhost:5000',
+    'dev': 'https://api-dev.lollllz.com',
+    'staging': 'https://api-staging.lollllz.com',
+    'prod': 'https://api-prod.lollllz.com',
+}
+
 
 class Workflow:
 
-    def __init__(self, dataset_type: str, problem_type: str, dataset_dir: str, environment: str, team_secret: str, task_id: str = None, skip_dataset: list = [], **kwargs: Any) -> None:
+    def __init__(self, dataset_type: str, problem_type: str, dataset_dir: str, environment: str, team_secret: str, task_id: str = None, skip_dataset: list = [],
+                 max_parallel_sessions: int = 1, pool_maxsize: int = 16, use_arrow: bool = False, compress_predictions: bool = False,
+                 **kwargs: Any) -> None:
         self.environment = environment
         self.log_level = kwargs['log']
         self.log = get_module_logger(__name__, self.log_level)
         self.base_url = self._get_endpoint(environment)
-        self.api_handler = LwllApiHandler(self.base_url, team_secret, log=kwargs['log'])
+        self.api_handler = LwllApiHandler(self.base_url, team_secret, pool_maxsize=pool_maxsize, use_arrow=use_arrow,
+                                          compress_predictions=compress_predictions, log=kwargs['log'])
         self.skip_dataset = skip_dataset
-        self.task_list = self.api_handler.get_all_tasks()
-        self.tasks = {
-            'image_classification': self._get_task_subset_by_type('image_classification'),
-            'object_detection': self._get_task_subset_by_type('object_detection'),
-            'machine_translation': self._get_task_subset_by_type('machine_translation'),
-            'video_classification': self._get_task_subset_by_type('video_classification')
-        }
+        # A single `task_id` run never looks at the task listing, so we only fetch and group tasks when we need them
+        self.task_list = [] if task_id else self.api_handler.get_all_tasks()
+        self.tasks = {} if task_id else self._group_tasks_by_type()
         '''self.tasks = {
             'image_classification': ['6d5e1f85-5d8f-4cc9-8184-299db03713f4'],
             'object_detection': ['dc75cc32-5db1-4767-b41f-b3dfa6b086a9'],
@@ -61,31 +72,29 @@ class Workflow:
         self.problem_type = problem_type
         self.dataset_dir = dataset_dir
         self.task_id = task_id
+        self.max_parallel_sessions = max_parallel_sessions  # how many task sessions of a problem type we run at once
 
         self._tasks_completed: List[str] = []  # private variable to allow us to keep track of the tasks we completed
-        self._task_types_completed = {
-            'image_classification--full': 0,
-            'image_classification--sample': 0,
-            'object_detection--full': 0,
-            'object_detection--sample': 0,
-            'video_classification--full': 0,
-            'video_classification--sample': 0,
-            'machine_translation--full': 0,
-            'machine_translation--sample': 0,
-        }
+        self._completed_lock = threading.Lock()  # guards our completed task bookkeeping when sessions run concurrently
+        self._task_types_completed: Counter = Counter()  # completed task counts keyed by (problem type, dataset config)
 
     def run(self) -> None:
         self.log.info(f"Starting Workflow Loop...")
         t_start = int(time.time())
-        self._launch_workflow_loop()
+        try:
+            self._launch_workflow_loop()
+        finally:
+            self.api_handler.close()
         t_end = int(time.time())
-        m, s = divmod(int(t_end - t_start), 60)
-        h, m = divmod(m, 60)
-        time_str = f'{h:d} Hours {m:02d} Minutes and {s:02d} seconds'
-        self.log.info('\n\n')
-        self.log.info(f'Tasks Completed: {self._tasks_completed}')
-        self.log.info(f'Tasks Completed Breakdown: {self._task_types_completed}')
-        self.log.info(f"Finished Complete Workflow run in {time_str}")
+        # Skip building the summary (which stringifies every completed task) when INFO records would be dropped anyway
+        if self.log.isEnabledFor(logging.INFO):
+            m, s = divmod(int(t_end - t_start), 60)
+            h, m = divmod(m, 60)
+            time_str = f'{h:d} Hours {m:02d} Minutes and {s:02d} seconds'
+            self.log.info('\n\n')
+            self.log.info(f'Tasks Completed: {self._tasks_completed}')
+            self.log.info(f'Tasks Completed Breakdown: {self._task_types_completed}')
+            self.log.info(f"Finished Complete Workflow run in {time_str}")
 
     def _launch_workflow_loop(self) -> None:
         if self.dataset_type in ['sample', 'all']:
@@ -119,52 +128,80 @@ class Workflow:
                           self.api_handler, self.dataset_dir, log=self.log_level)
         session.run()
         self._tasks_completed.append(f"{self.task_id}--{dataset_config}")
-        self._task_types_completed[f"{self.problem_type}--{dataset_config}"] += 1
+        self._task_types_completed[(self.problem_type, dataset_config)] += 1
 
     def _session_loop(self, dataset_config: str, problem_type_config: str) -> None:
-        for _task in self.tasks[problem_type_config]:
-            self.log.info(f'Creating session for task: {_task}')
-            session = Session(self.environment, dataset_config, _task, self.api_handler,
-                              self.dataset_dir, problem_type_config, log=self.log_level)
-            session.run()
-            self._tasks_completed.append(f"{_task}--{dataset_config}")
-            self._task_types_completed[f"{problem_type_config}--{dataset_config}"] += 1
+        # Sessions on different tasks don't share any state and mostly wait on the api, so we run them concurrently
+        with ThreadPoolExecutor(max_workers=self.max_parallel_sessions) as executor:
+            futures = [executor.submit(self._run_one_session, dataset_config, _task, problem_type_config)
+                       for _task in self.tasks[problem_type_config]]
+            for future in as_completed(futures):
+                if future.exception() is not None:
+                    # Stop at the first failing session like a sequential run would, rather than letting the executor
+                    # work through every queued session before the error surfaces
+                    for pending in futures:
+                        pending.cancel()
+                    future.result()
         return
 
+    def _run_one_session(self, dataset_config: str, task_id: str, problem_type_config: str) -> None:
+        self.log.info(f'Creating session for task: {task_id}')
+        session = Session(self.environment, dataset_config, task_id, self.api_handler,
+                          self.dataset_dir, problem_type_config, log=self.log_level)
+        session.run()
+        with self._completed_lock:
+            self._tasks_completed.append(f"{task_id}--{dataset_config}")
+            self._task_types_completed[(problem_type_config, dataset_config)] += 1
+
     @staticmethod
     def _get_endpoint(environment: str) -> str:
         """
         Lookup to get our valid url based on the environment
         """
-        url_lookup = {
-            'local': 'http://localhost:5000',
-            'dev': 'https://api-dev.lollllz.com',
-            'staging': 'https://api-staging.lollllz.com',
-            'prod': 'https://api-prod.lollllz.com',
-        }
-        url = url_lookup[environment]
-        return url
+        return _URL_LOOKUP[environment]
 
-    def _get_task_subset_by_type(self, subset_type: str) -> List[str]:
+    def _group_tasks_by_type(self) -> Dict[str, List[str]]:
         """
-        Helper function that returns the task ids in a list that match a specified
-        problem type
-
-        Params
-        ------
-
-        subset_type : str
-            The task_type subset you want to get back
+        Helper function that returns the task ids grouped in lists by their problem type in a single pass over
+        `self.task_list`
         """
-        subset_tasks = []
+        groups: Dict[str, List[str]] = {
+            'image_classification': [],
+            'object_detection': [],
+            'machine_translation': [],
+            'video_classification': [],
+        }
+        task_metas = self._get_all_task_metadata()
         for _task in self.task_list:
+            if _task not in task_metas:
+                continue
+            task_meta = task_metas[_task]
             try:
-                task_meta = self.api_handler.get_task_metadata(_task)
                 if task_meta['task_metadata']['adaptation_dataset'] in self.skip_dataset or task_meta['task_metadata']['base_dataset'] in self.skip_dataset:
                     self.log.info(f"Skipping task: {_task} - in dataset skip list ({self.skip_dataset})")
                     continue
-                if task_meta['task_metadata']['problem_type'] == subset_type:
-                    subset_tasks.append(_task)
+                problem_type = task_meta['task_metadata']['problem_type']
+                if problem_type in groups:
+                    groups[problem_type].append(_task)
             except Exception as err:
                 self.log.error(f"Error getting task metadata for task: {_task}, error: {err}")
-        return subset_tasks
+        return groups
+
+    def _get_all_task_metadata(self) -> Dict[str, dict]:
+        """
+        Helper function that fetches the metadata of every task in `self.task_list`
+
+        The requests are independent so we issue them concurrently. Tasks whose metadata we fail to get are
+        logged and left out.
+        """
+        task_metas: Dict[str, dict] = {}
+        # Sized to the api handler's connection pool so every worker gets a kept alive connection
+        with ThreadPoolExecutor(max_workers=self.api_handler.pool_maxsize) as executor:
+            futures = {executor.submit(self.api_handler.get_task_metadata, _task): _task for _task in self.task_list}
+            for future in as_completed(futures):
+                _task = futures[future]
+                try:
+                    task_metas[_task] = future.result()
+                except Exception as err:
+                    self.log.error(f"Error getting task metadata for task: {_task}, error: {err}")
+        return task_metas
@@ -30,7 +30,18 @@
 from pathlib import Path
 import fire
 from jpl_ta1.workflow import Workflow
-from jpl_ta1.logger import get_module_logger
+from jpl_ta1.logger import get_module_logger, VALID_LOG_LEVELS
+
+_VALID_DATASET_TYPES = frozenset({'sample', 'full', 'all'})
+_VALID_PROBLEM_TYPES = frozenset({'image_classification', 'object_detection', 'machine_translation', 'video_classification', 'all'})
+_VALID_ENVIRONMENTS = frozenset({'local', 'dev', 'staging', 'prod'})
+# Subdirectories `dataset_dir` needs to contain for each environment
+_REQUIRED_DATASET_SUBDIRS = {
+    'local': ('development', 'external'),
+    'dev': ('development', 'external'),
+    'staging': ('development', 'external'),
+    'prod': ('evaluation', 'external'),
+}
 
 class CLI:
     """
@@ -41,41 +52,44 @@ class CLI:
     def __init__(self) -> None:
         pass
 
-    def launch_system(self, dataset_type: str, problem_type: str, dataset_dir: str, environment: str, team_secret: str, skip_dataset: list = [], log_level: str = 'INFO', task_id: str = None) -> None:
+    def launch_system(self, dataset_type: str, problem_type: str, dataset_dir: str, environment: str, team_secret: str, skip_dataset: list = [], log_level: str = 'INFO', task_id: str = None,
+                      max_parallel_sessions: int = 1, pool_maxsize: int = 16, use_arrow: bool = False, compress_predictions: bool = False) -> None:
         """
         Main launch method that takes our parameters and runs our system
         """
-        valid_dataset_types = ['sample', 'full', 'all']
-        if dataset_type not in valid_dataset_types:
-            raise Exception(f'Invalid `dataset_type`, expected one of {valid_dataset_types}')
+        if dataset_type not in _VALID_DATASET_TYPES:
+            raise Exception(f'Invalid `dataset_type`, expected one of {sorted(_VALID_DATASET_TYPES)}')
 
-        valid_problem_types = ['image_classification', 'object_detection', 'machine_translation', 'video_classification',
-                               'all']
-        if problem_type not in valid_problem_types:
-            raise Exception(f'Invalid `problem_type`, expected one of {valid_problem_types}')
+        if problem_type not in _VALID_PROBLEM_TYPES:
+            raise Exception(f'Invalid `problem_type`, expected one of {sorted(_VALID_PROBLEM_TYPES)}')
 
-        valid_environments = ['local', 'dev', 'staging', 'prod']
-        if environment not in valid_environments:
-            raise Exception(f'Invalid `environment`, expected one of {valid_environments}')
+        if environment not in _VALID_ENVIRONMENTS:
+            raise Exception(f'Invalid `environment`, expected one of {sorted(_VALID_ENVIRONMENTS)}')
 
-        if not Path(dataset_dir).exists():
+        root = Path(dataset_dir)
+        if not root.is_dir():
             raise Exception('`dataset_dir` does not exist..')
-        if environment in ['local', 'dev', 'staging'] and not Path(dataset_dir).joinpath('development').exists():
-            raise Exception(f"Can't find `development` dataset directory in path {dataset_dir} while running in one of {['local', 'dev', 'staging']} mode")
-        if environment == 'prod' and not Path(dataset_dir).joinpath('evaluation').exists():
-            raise Exception(f"Can't find `evaluation` dataset directory in path {dataset_dir} while running in `prod` mode")
-        if not Path(dataset_dir).joinpath('external').exists():
-            raise Exception(f"Can't find `external` dataset directory in path {dataset_dir}")
-
-        valid_log_levels = ['DEBUG', 'INFO', 'WARNING', 'ERROR']
-        if log_level not in valid_log_levels:
-            raise Exception(f'Invalid `log_level`, expected one of {valid_log_levels}, but got {log_level}')
+        for subdir in _REQUIRED_DATASET_SUBDIRS[environment]:
+            if not (root / subdir).is_dir():
+                raise Exception(f"Can't find `{subdir}` dataset directory in path {dataset_dir} while running in `{environment}` mode")
+
+        if log_level not in VALID_LOG_LEVELS:
+            raise Exception(f'Invalid `log_level`, expected one of {sorted(VALID_LOG_LEVELS)}, but got {log_level}')
         # log = Logger(__name__, log_level)
 
-        skip_dataset = [skip_dataset] if isinstance(skip_dataset, str) else [dataset for dataset in skip_dataset]
+        if max_parallel_sessions < 1:
+            raise Exception(f'Invalid `max_parallel_sessions`, expected a positive integer, but got {max_parallel_sessions}')
+        if pool_maxsize < 1:
+            raise Exception(f'Invalid `pool_maxsize`, expected a positive integer, but got {pool_maxsize}')
+        if use_arrow and compress_predictions:
+            raise Exception('`use_arrow` and `compress_predictions` are mutually exclusive, only gzip compressed JSON predictions are supported')
+
+        skip_dataset = [skip_dataset] if isinstance(skip_dataset, str) else list(skip_dataset)
 
         # Now launch the system
-        workflow = Workflow(dataset_type, problem_type, dataset_dir, environment, team_secret, task_id, skip_dataset=skip_dataset, log=log_level)
+        workflow = Workflow(dataset_type, problem_type, dataset_dir, environment, team_secret, task_id, skip_dataset=skip_dataset,
+                            max_parallel_sessions=max_parallel_sessions, pool_maxsize=pool_maxsize, use_arrow=use_arrow,
+                            compress_predictions=compress_predictions, log=log_level)
         workflow.run()
 
 
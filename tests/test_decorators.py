@@ -0,0 +1,113 @@
+# Copyright (c) 2023 California Institute of Technology (“Caltech”). U.S.
+# Government sponsorship acknowledged.
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the name of Caltech nor its operating division, the Jet Propulsion
+#   Laboratory, nor the names of its contributors may be used to endorse or
+#   promote products derived from this software without specific prior written
+#   permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import asyncio
+from functools import partial
+from typing import Any, List
+import pytest
+from jpl_ta1.utils import decorators
+from jpl_ta1.utils.decorators import retry
+
+
+@pytest.fixture
+def sleeps(monkeypatch: Any) -> List[float]:
+    """
+    Records the backoff delays of both the sync and async retry wrappers instead of actually sleeping
+    """
+    recorded: List[float] = []
+
+    async def fake_async_sleep(delay: float) -> None:
+        recorded.append(delay)
+
+    monkeypatch.setattr(decorators.time, 'sleep', recorded.append)
+    monkeypatch.setattr(decorators.asyncio, 'sleep', fake_async_sleep)
+    return recorded
+
+
+class FlakyCallable:
+    """
+    Callable object with an `async def __call__` that raises on its first call
+    """
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def __call__(self, value: int) -> int:
+        self.calls += 1
+        if self.calls == 1:
+            raise ValueError('transient failure')
+        return value
+
+
+def _make_flaky_coroutine_function() -> Any:
+    calls = {'count': 0}
+
+    async def flaky(value: int) -> int:
+        calls['count'] += 1
+        if calls['count'] == 1:
+            raise ValueError('transient failure')
+        return value
+
+    return flaky, calls
+
+
+def test_retry_awaits_coroutine_function(sleeps: List[float]) -> None:
+    flaky, calls = _make_flaky_coroutine_function()
+    assert asyncio.run(retry(ValueError)(flaky)(7)) == 7
+    assert calls['count'] == 2
+    assert len(sleeps) == 1
+
+
+def test_retry_awaits_partial_of_coroutine_function(sleeps: List[float]) -> None:
+    flaky, calls = _make_flaky_coroutine_function()
+    assert asyncio.run(retry(ValueError)(partial(flaky, 7))()) == 7
+    assert calls['count'] == 2
+    assert len(sleeps) == 1
+
+
+def test_retry_awaits_async_callable_object(sleeps: List[float]) -> None:
+    flaky = FlakyCallable()
+    assert asyncio.run(retry(ValueError)(flaky)(7)) == 7
+    assert flaky.calls == 2
+    assert len(sleeps) == 1
+
+
+def test_retry_reraises_on_last_attempt_without_sleeping(sleeps: List[float]) -> None:
+    calls = {'count': 0}
+
+    @retry(ValueError, tries=3)
+    def always_fails() -> None:
+        calls['count'] += 1
+        raise ValueError('permanent failure')
+
+    with pytest.raises(ValueError):
+        always_fails()
+    assert calls['count'] == 3
+    # we only back off between attempts, never after the final one
+    assert len(sleeps) == 2